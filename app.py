@@ -1,18 +1,21 @@
 import asyncio
 from dotenv import load_dotenv
 import os
-import json
+import io
+import orjson
 import logging
+import re
+import shlex
 from datetime import datetime
 from apscheduler.schedulers.asyncio import AsyncIOScheduler
 from apscheduler.events import EVENT_JOB_REMOVED
 from apscheduler.triggers.cron import CronTrigger
-from typing import Any, Literal, Optional, Union
+from typing import Any, Callable, Literal, Optional, Union
 import discord
 from discord import Intents, DMChannel, Embed, Color
 from discord.ext import commands
 from functools import wraps
-from utils import read_json, read_from_file, write_to_file, extract_json_objects, parse_log_time, format_timedelta, time_since
+from utils import async_ttl_cache, read_json, write_json, read_from_file_sync, write_to_file, extract_log_time, parse_log_time, format_timedelta, time_since
 
 load_dotenv()
 DATA_PATH = "data"
@@ -20,14 +23,40 @@ STATIC_PATH = "static"
 USERNAME = os.environ.get("USERNAME", "root")
 HOST = os.environ.get("HOST", "localhost")
 PORT = os.environ.get("PORT", "22")
-SSH = f"ssh {USERNAME}@{HOST} -p {PORT}"
+SSH_CONTROL_PATH = os.environ.get("SSH_CONTROL_PATH", "/tmp/mc-bot-%r@%h:%p")
+# Reuse a single multiplexed connection for every ssh call instead of a new handshake each time
+SSH_ARGS = [
+	"ssh",
+	"-o", "ControlMaster=auto",
+	"-o", f"ControlPath={SSH_CONTROL_PATH}",
+	"-o", "ControlPersist=600",
+	"-p", PORT,
+	f"{USERNAME}@{HOST}",
+]
+SSH_CONNECTION_ERROR = 255 # exit code used by ssh itself
+# Sessions multiplexed over the master connection at once, sshd allows 10 by default (MaxSessions)
+SSH_MAX_SESSIONS = int(os.environ.get("SSH_MAX_SESSIONS", "8"))
 SCRIPTS_PATH = os.environ.get("SCRIPTS_PATH", ".").rstrip("/")
 MINECRAFT_LOGS_PATH = os.environ.get("MINECRAFT_LOGS_PATH", ".").rstrip("/")
 PLAYERS_DATA_PATH = os.path.join(DATA_PATH, "players.json")
 PRIVILEGED_USERS_PATH = os.path.join(DATA_PATH, "privileged_users.txt")
+HELP_THUMBNAIL_FILENAME = "minecraft.png"
 OWNER_ID = os.environ.get("OWNER_ID", None)
-
-cache = {}
+PLAYERS_CACHE_TTL = 60 # seconds usernames and stats read from the server are reused
+LOG_LISTING_CACHE_TTL = 30 # seconds the log files listing is reused
+OWNER_TAG = None # fetched once in on_ready
+PRIVILEGED_USERS: set[str] = set() # loaded once in on_ready, kept in sync by grant/revoke
+privileged_users_lock: Optional[asyncio.Lock] = None
+
+STATS_CUSTOM_KEY = "minecraft:custom"
+STATS_PLAY_TIME_KEY = "minecraft:play_time"
+EMPTY_STATS: dict = {} # shared fallback for missing stats, never mutated
+JOIN_LEAVE_PATTERN = re.compile(r": (\w+) (joined|left) the game") # like ...]: Steve joined the game
+
+ssh_sessions_semaphore: Optional[asyncio.Semaphore] = None # created on first use, inside the bot's loop
+sorted_mine_commands: Optional[list] = None # sorted on first use, commands are registered at import
+help_commands: dict[tuple[bool, bool], list] = {} # commands listed by help per (privileged, owner) level
+help_thumbnail: Optional[bytes] = None # read from disk on first use
 
 # Set up logging
 logging.basicConfig(
@@ -61,28 +90,29 @@ scheduler.add_listener(on_job_removed, EVENT_JOB_REMOVED)
 
 # ========= FUNCTIONS ==========
 
-async def load_privileged_users() -> list[str]:
-	content = await read_from_file(PRIVILEGED_USERS_PATH)
-	return content.split("\n")
+def load_privileged_users() -> set[str]:
+	# Only read once at startup, a tiny file is cheaper to read directly than through the executor
+	content = read_from_file_sync(PRIVILEGED_USERS_PATH).decode("utf-8", "replace")
+	return {user for user in content.split("\n") if user}
 
-async def save_privileged_users(users: list[str]):
-	await write_to_file(PRIVILEGED_USERS_PATH, "\n".join(users))
+async def save_privileged_users():
+	"""
+	Persist the in-memory privileged users, one write at a time.
+	"""
+	async with privileged_users_lock:
+		await write_to_file(PRIVILEGED_USERS_PATH, "\n".join(sorted(PRIVILEGED_USERS)))
 
-async def is_owner_user(username: str) -> bool:
-	return username == str(await bot.fetch_user(OWNER_ID))
+def is_owner_user(username: str) -> bool:
+	return OWNER_TAG is not None and username == OWNER_TAG
 
-async def is_privileged_user(username: str) -> bool:
-	privileged_users = await load_privileged_users()
-	user_is_owner = await is_owner_user(username)
-	if user_is_owner or username in privileged_users:
-		return True
-	return False
+def is_privileged_user(username: str) -> bool:
+	return is_owner_user(username) or username in PRIVILEGED_USERS
 
 def owner_command():
 	def decorator(func):
 		@wraps(func)
 		async def wrapper(ctx, *args, **kwargs):
-			if await is_owner_user(str(ctx.author)):
+			if is_owner_user(str(ctx.author)):
 				return await func(ctx, *args, **kwargs)
 			else:
 				await ctx.send("You do not have permission to use this command.")
@@ -95,7 +125,7 @@ def privileged_command():
 	def decorator(func):
 		@wraps(func)
 		async def wrapper(ctx, *args, **kwargs):
-			if await is_privileged_user(str(ctx.author)):
+			if is_privileged_user(str(ctx.author)):
 				return await func(ctx, *args, **kwargs)
 			else:
 				await ctx.send("You do not have permission to use this command.")
@@ -108,16 +138,23 @@ def build_errors_string(errors: list, indent: int = 0):
 	"""
 	Build a string with the errors recursively, adding indentation for each level.
 	"""
-	string = ""
+	parts = []
+	_build_errors_parts(errors, indent, parts)
+	return "".join(parts)
+
+def _build_errors_parts(errors: list, indent: int, parts: list[str]):
+	"""
+	Append the lines of build_errors_string to parts, so nested errors are joined only once.
+	"""
 	indentation = "\t" * indent
 	for (function, message, error) in errors:
-		string += f"{indentation}{function}: \"{message}\"\n"
-		if isinstance(error, str):
-			if error:
-				string += f"{indentation}{error}\n"
+		if not isinstance(error, str):
+			parts.append(f"{indentation}{function}: \"{message}\"\n")
+			_build_errors_parts(error, indent + 1, parts)
+		elif error:
+			parts.append(f"{indentation}{function}: \"{message}\"\n{indentation}{error}\n")
 		else:
-			string += build_errors_string(error, indent + 1)
-	return string
+			parts.append(f"{indentation}{function}: \"{message}\"\n")
 
 def log_errors(errors: list):
 	"""
@@ -125,125 +162,195 @@ def log_errors(errors: list):
 	"""
 	logging.error(build_errors_string(errors))
 
-async def get_players(errors: list=[]) -> dict:
+def get_ssh_sessions_semaphore() -> asyncio.Semaphore:
+	"""
+	Get the semaphore bounding the concurrent ssh sessions, creating it inside the running loop.
+	"""
+	global ssh_sessions_semaphore
+	if ssh_sessions_semaphore is None:
+		ssh_sessions_semaphore = asyncio.Semaphore(SSH_MAX_SESSIONS)
+	return ssh_sessions_semaphore
+
+async def run_ssh_command(command: str, retry: bool=True) -> tuple[int, bytes, bytes]:
+	"""
+	Run a command on the server through ssh and return its exit code, stdout and stderr.
+	If the connection fails, it is reopened and the command is retried once, unless retry is False.
+	"""
+	# Exec ssh directly instead of going through a local shell
+	async with get_ssh_sessions_semaphore():
+		proc = await asyncio.create_subprocess_exec(
+			*SSH_ARGS, command,
+			stdout=asyncio.subprocess.PIPE,
+			stderr=asyncio.subprocess.PIPE
+		)
+		stdout, stderr = await proc.communicate()
+	if proc.returncode == SSH_CONNECTION_ERROR and retry:
+		# The master connection may have dropped, the next call opens a new one
+		logging.warning(f"SSH connection error, retrying: {stderr.decode('utf-8', 'replace').strip()}")
+		return await run_ssh_command(command, retry=False)
+	return proc.returncode, stdout, stderr
+
+async def stream_ssh_command(command: str, stop: Callable[[bytes], bool], retry: bool=True) -> tuple[int, list[bytes], bytes]:
+	"""
+	Run a command on the server through ssh and read its stdout line by line until stop returns True for a line.
+	The command is then terminated and reported as successful, with the lines read so far.
+	"""
+	async with get_ssh_sessions_semaphore():
+		proc = await asyncio.create_subprocess_exec(
+			*SSH_ARGS, command,
+			stdout=asyncio.subprocess.PIPE,
+			stderr=asyncio.subprocess.PIPE
+		)
+		stderr_task = asyncio.ensure_future(proc.stderr.read())
+		lines = []
+		stopped = False
+		try:
+			async for line in proc.stdout:
+				line = line.rstrip(b"\n")
+				lines.append(line)
+				if stop(line):
+					stopped = True
+					break
+			if stopped and proc.returncode is None:
+				try:
+					proc.terminate()
+				except ProcessLookupError:
+					# It already exited after printing the last line
+					pass
+			stderr = await stderr_task
+		finally:
+			# Don't leave ssh running if stop raised or the caller was cancelled
+			if proc.returncode is None:
+				try:
+					proc.kill()
+				except ProcessLookupError:
+					pass
+			stderr_task.cancel()
+			await proc.wait()
+	if stopped:
+		return 0, lines, stderr
+	if proc.returncode == SSH_CONNECTION_ERROR and not lines and retry:
+		logging.warning(f"SSH connection error, retrying: {stderr.decode('utf-8', 'replace').strip()}")
+		return await stream_ssh_command(command, stop, retry=False)
+	return proc.returncode, lines, stderr
+
+def get_playtime_seconds(stats: dict) -> int:
+	"""
+	Get the playtime in seconds from the stats of a player.
+	"""
+	return stats.get(STATS_CUSTOM_KEY, EMPTY_STATS).get(STATS_PLAY_TIME_KEY, 0) // 20 # ticks -> seconds
+
+@async_ttl_cache(ttl=PLAYERS_CACHE_TTL, key=lambda *args, **kwargs: ())
+async def get_players(errors: Optional[list]=None) -> dict:
 	"""
 	Get the players usernames and uuids from the server.
 	"""
+	if errors is None:
+		errors = []
 	# Run the command
 	command = "cat minecraft_server/usernamecache.json"
-	proc = await asyncio.create_subprocess_shell(
-		f"{SSH} -v {command}",
-		stdout=asyncio.subprocess.PIPE,
-		stderr=asyncio.subprocess.PIPE
-	)
-	
-	stdout, stderr = await proc.communicate()
-	stdout = stdout.decode("utf-8")
-	stderr = stderr.decode("utf-8")
+	returncode, stdout, stderr = await run_ssh_command(command)
 	
-	# Parse the result
-	if proc.returncode != 0:
-		errors.append((get_players.__name__, "SSH Command Error when reading usernames", stderr))
+	# Parse the result straight from the raw output, without decoding it to a str first
+	if returncode != 0:
+		errors.append((get_players.__name__, "SSH Command Error when reading usernames", stderr.decode("utf-8", "replace")))
 		return {}
 	try:
-		players = json.loads(stdout)
-	except json.JSONDecodeError:
-		errors.append((get_players.__name__, "Invalid JSON output when reading usernames", stdout))
+		players = orjson.loads(stdout)
+	except orjson.JSONDecodeError:
+		errors.append((get_players.__name__, "Invalid JSON output when reading usernames", stdout.decode("utf-8", "replace")))
 		return {}
 	return players
 
-async def get_player_stats(uuids: Union[str, list], errors: list=[]) -> dict:
+@async_ttl_cache(ttl=PLAYERS_CACHE_TTL, key=lambda uuids, *args, **kwargs: (uuids,) if isinstance(uuids, str) else tuple(uuids))
+async def get_player_stats(uuids: Union[str, list], errors: Optional[list]=None) -> dict:
 	"""
-	Get the stats of a player or a list of players.
+	Get the stats of a player or a list of players, reading each stats file concurrently.
 	"""
-	# Build and run the command
-	files = " ".join([f"minecraft_server/world/stats/{uuid}.json" for uuid in uuids])
-	command = f"cat {files}"
-	proc = await asyncio.create_subprocess_shell(
-		f"{SSH} -v {command}",
-		stdout=asyncio.subprocess.PIPE,
-		stderr=asyncio.subprocess.PIPE
-	)
-	
-	stdout, stderr = await proc.communicate()
-	stdout = stdout.decode("utf-8")
-	stderr = stderr.decode("utf-8")
+	if errors is None:
+		errors = []
+	if isinstance(uuids, str):
+		uuids = [uuids]
 
-	if proc.returncode != 0:
-		errors.append((get_player_stats.__name__, "SSH Command Error when reading player stats", stderr))
-		return {}
-	
-	# Find each JSON object in the output
-	json_objects = extract_json_objects(stdout)
-	
-	try:
-		players_stats: list[dict] = [json.loads(stats) for stats in json_objects]
-	except json.JSONDecodeError as e:
-		errors.append((get_player_stats.__name__, "Invalid JSON output when reading player stats", str(e)))
-		return {}
-	
-	# Extract stats for each player
+	async def get_one_player_stats(uuid: str) -> Optional[dict]:
+		command = f"cat minecraft_server/world/stats/{uuid}.json"
+		returncode, stdout, stderr = await run_ssh_command(command)
+
+		if returncode != 0:
+			errors.append((get_player_stats.__name__, "SSH Command Error when reading player stats", f"Error when reading stats of {uuid}: {stderr.decode('utf-8', 'replace')}"))
+			return None
+		try:
+			return orjson.loads(stdout)
+		except orjson.JSONDecodeError as e:
+			errors.append((get_player_stats.__name__, "Invalid JSON output when reading player stats", f"Error when reading stats of {uuid}: {e}"))
+			return None
+
+	results = await asyncio.gather(*(get_one_player_stats(uuid) for uuid in uuids), return_exceptions=True)
+
+	# Extract stats for each player, skipping the ones that could not be read
 	stats_dict = {}
-	for uuid, player_stats in zip(uuids, players_stats):
-		stats_dict[uuid] = player_stats.get("stats", {})
+	for uuid, player_stats in zip(uuids, results):
+		if isinstance(player_stats, Exception):
+			errors.append((get_player_stats.__name__, "Failed to read player stats", f"Error when reading stats of {uuid}: {player_stats}"))
+		elif player_stats is not None:
+			stats_dict[uuid] = player_stats.get("stats", {})
 	
 	return stats_dict
 
-async def update_players_data(errors: list=[]):
+async def update_players_data(errors: Optional[list]=None):
 	"""
 	Update the players data.
 	"""
-	# Read the players data
-	players_data = await read_json(PLAYERS_DATA_PATH)
+	if errors is None:
+		errors = []
+	# Read the saved players data while the players are fetched from the server
+	get_players_errors = []
+	players_data, players = await asyncio.gather(read_json(PLAYERS_DATA_PATH), get_players(get_players_errors))
 	old_players_data: dict = players_data.get("players", {})
 	players_data["last_updated"] = datetime.now().strftime("%Y-%m-%d %H:%M:%S")
-	get_players_errors = []
-	players = await get_players(get_players_errors)
 	if not players:
 		errors.append((update_players_data.__name__, "Failed to get players data", get_players_errors))
 		return
 	
 	# Update the players data
-	uuids, usernames = zip(*players.items())
-	players_data["players"] = {}
-
 	get_player_stats_errors = []
-	all_players_stats = await get_player_stats(list(uuids), get_player_stats_errors)
+	all_players_stats = await get_player_stats(list(players), get_player_stats_errors)
 	
-	if not all_players_stats:
+	if get_player_stats_errors:
 		errors.append((update_players_data.__name__, "Failed to get player stats", get_player_stats_errors))
+	if not all_players_stats:
 		return
 	
-	for uuid, username in zip(uuids, usernames):
-		player_data = old_players_data.get(uuid, {})
-		player_stats = all_players_stats.get(uuid, {})
-		player_data["username"] = username
-		player_data["playtime"] = player_stats.get("minecraft:custom", {}).get("minecraft:play_time", 0) // 20 # ticks -> seconds
-		players_data["players"][uuid] = player_data
-
-	# TODO: finish
+	new_players_data = {}
+	for uuid, username in players.items():
+		player_data = {**old_players_data.get(uuid, {}), "username": username}
+		# Keep the saved playtime of the players whose stats could not be read
+		if uuid in all_players_stats:
+			player_data["playtime"] = get_playtime_seconds(all_players_stats[uuid])
+		new_players_data[uuid] = player_data
+	players_data["players"] = new_players_data
+
+	# Save the players data, serializing it off the event loop
+	await write_json(PLAYERS_DATA_PATH, players_data)
 
 async def run_script(
 	script: str,
 	args: list[str],
-	errors: list=[]
+	errors: Optional[list]=None
 ) -> bool:
 	"""
 	Run a script on the server.
 	"""
+	if errors is None:
+		errors = []
 	command = f"bash {SCRIPTS_PATH}/{script}{' ' if args else ''}{' '.join(args)}"
 	logging.info(f"Running script: {command}")
-	proc = await asyncio.create_subprocess_shell(
-		f"{SSH} -v {command}",
-		stdout=asyncio.subprocess.PIPE,
-		stderr=asyncio.subprocess.PIPE
-	)
-	
-	stdout, stderr = await proc.communicate()
+	# Scripts may not be safe to run twice if the connection dropped halfway
+	returncode, stdout, stderr = await run_ssh_command(command, retry=False)
 	stdout = stdout.decode("utf-8")
 	stderr = stderr.decode("utf-8")
 	
-	if proc.returncode != 0:
+	if returncode != 0:
 		errors.append((run_script.__name__, "SSH Command Error when running script", f"Error when running {command}: {stderr}"))
 		return False
 	return True
@@ -251,9 +358,9 @@ async def run_script(
 async def run_command(ctx: commands.Context, command_arg: str):
 	# Run the script
 	errors = []
-	command_str = f"\"\\\"{command_arg}\\\"\"" # like "\"command\"", otherwise it doesn not work
+	command_str = shlex.quote(command_arg) # quoted once for the remote shell
 	success = await run_script("run_mc_command.sh", [command_str], errors)
-	user_msg = await ctx.fetch_message(ctx.message.id)
+	user_msg = ctx.message
 	if not success:
 		# Log errors and reply
 		error_msg = "Failed to run script."
@@ -264,132 +371,141 @@ async def run_command(ctx: commands.Context, command_arg: str):
 		# React with a checkmark
 		await user_msg.add_reaction("✅")
 
-async def read_log_file(file_path: str, errors: list=[]):
-	"""
-	Read a compressed or not log file.
-	"""
-	# Read from cache if available
-	if file_path in cache:
-		return cache[file_path]
-	
-	# Run ssh command to read file
-	command = f"zcat {file_path}" if file_path.endswith(".gz") else f"cat {file_path}"
-	proc = await asyncio.create_subprocess_shell(
-		f"{SSH} -v {command}",
-		stdout=asyncio.subprocess.PIPE,
-		stderr=asyncio.subprocess.PIPE
-	)
-	
-	stdout, stderr = await proc.communicate()
-	stdout = stdout.decode("utf-8")
-	stderr = stderr.decode("utf-8")
-
-	if proc.returncode != 0:
-		errors.append((read_log_file.__name__, "SSH Command Error when reading log file", f"Error when reading {file_path}: {stderr}"))
-		return ""
-	
-	# Cache the result
-	cache[file_path] = stdout
-	return stdout
-
-async def list_log_files(sort_by: Literal["name", "date"], errors: list=[]):
+@async_ttl_cache(ttl=LOG_LISTING_CACHE_TTL, key=lambda sort_by, *args, **kwargs: sort_by)
+async def list_log_files(sort_by: Literal["name", "date"], errors: Optional[list]=None):
 	"""
 	List log files in the MINECRAFT_LOGS_PATH directory, sorted by name or date.
 	"""
-	# Read from cache if available
-	key = "log_files_" + sort_by
-	if key in cache:
-		return cache[key]
-	
-	# Run ssh command to list log files
-	sort_option = "-t" if sort_by == "date" else ""
-	command = f"ls {sort_option} {MINECRAFT_LOGS_PATH}/*.log* | grep -v debug"
-	
-	proc = await asyncio.create_subprocess_shell(
-		f"{SSH} -v {command}",
-		stdout=asyncio.subprocess.PIPE,
-		stderr=asyncio.subprocess.PIPE
-	)
-	
-	stdout, stderr = await proc.communicate()
-	stdout = stdout.decode("utf-8")
-	stderr = stderr.decode("utf-8")
+	if errors is None:
+		errors = []
+	# Run ssh command to list log files with their modification time, leaving out debug logs
+	# The path is left unquoted like SCRIPTS_PATH, so ~ and $HOME expand on the server
+	command = f"find {MINECRAFT_LOGS_PATH} -maxdepth 1 -type f -name '*.log*' ! -name '*debug*' -printf '%T@ %p\\n'"
+	returncode, stdout, stderr = await run_ssh_command(command)
 
-	if proc.returncode != 0:
-		errors.append((list_log_files.__name__, "SSH Command Error when listing log files", f"Error: {stderr}"))
+	if returncode != 0:
+		errors.append((list_log_files.__name__, "SSH Command Error when listing log files", f"Error: {stderr.decode('utf-8', 'replace')}"))
 		return []
 	
-	log_files = stdout.strip().split('\n')
-	log_files = [file.strip() for file in log_files if file.strip()]
-	
-	# Cache the result
-	cache[key] = log_files
-	return log_files
+	# Sort locally, newest first by date like ls -t
+	log_files = [line.split(" ", 1) for line in stdout.decode("utf-8", "replace").splitlines() if line]
+	if sort_by == "date":
+		log_files.sort(key=lambda log_file: float(log_file[0]), reverse=True)
+	else:
+		log_files.sort(key=lambda log_file: log_file[1])
+	return [path for _, path in log_files]
 
-async def search_string_in_logs(string: str, k: int=-1, max_search_lines: int=-1, errors: list=[]) -> tuple[list[str], int]:
+async def search_strings_in_logs(
+	strings: list[str],
+	stop: Callable[[str], bool],
+	errors: Optional[list]=None
+) -> list[str]:
 	"""
-	Search for a string in the log files and return the first k lines that contain it.
+	Search for any of the strings in the log files, newest lines first, and return the lines that contain one.
+	The search ends after the first line for which stop returns True.
+	The search runs on the server so only the matched lines are transferred.
 	"""
+	if errors is None:
+		errors = []
 	# Get the log files paths
 	list_log_files_errors = []
 	log_files_paths = await list_log_files(sort_by="date", errors=list_log_files_errors)
 	if not log_files_paths:
-		errors.append((search_string_in_logs.__name__, "Failed to list log files", list_log_files_errors))
-		return [], -1
+		errors.append((search_strings_in_logs.__name__, "Failed to list log files", list_log_files_errors))
+		return []
 	
-	# Read the log files one by one until k strings are found
-	matched_lines = []
-	line_count = 0
-	for log_file_path in log_files_paths:
-		if (k != -1 and len(matched_lines) >= k) or (max_search_lines != -1 and line_count >= max_search_lines):
-			break
-		read_log_file_errors = []
-		lines = await read_log_file(log_file_path, read_log_file_errors)
-		lines = lines.split('\n')
-		if read_log_file_errors:
-			errors.append((search_string_in_logs.__name__, "Failed to read log file", read_log_file_errors))
-			return [], -1
-		# check if the string is in the lines
-		for line in lines[::-1]:
-			line_count += 1
-			if string in line:
-				matched_lines.append(line)
-			if (k != -1 and len(matched_lines) >= k) or (max_search_lines != -1 and line_count >= max_search_lines):
-				break
-	return matched_lines, line_count
-
-async def last_time_joined(username: str, errors: list=[]) -> (str, str):
-	"""
-	Get the last time a player joined and left the server.
-	"""
-	# Search for the "joined the game" pattern
-	joined_pattern = f"{username} joined the game"
-	search_string_in_logs_errors = []
-	joined_lines, joined_line_count = await search_string_in_logs(joined_pattern, k=1, errors=search_string_in_logs_errors)
-	if search_string_in_logs_errors:
-		errors.append((last_time_joined.__name__, "Error searching for joined pattern", search_string_in_logs_errors))
-		return ("", "")
-	if not joined_lines:
-		errors.append((last_time_joined.__name__, "No joined pattern found", f"No log lines found with pattern: {joined_pattern}"))
-		return ("No data", "No data")
-
-	# Extract the joined time
-	joined_time = joined_lines[0].split(']')[0][1:-4]
-
-	# Search for the "left the game" pattern until joined_line_count lines are searched
-	left_pattern = f"{username} left the game"
-	search_string_in_logs_errors = []
-	left_lines, _ = await search_string_in_logs(left_pattern, k=1, max_search_lines=joined_line_count, errors=search_string_in_logs_errors)
-	if search_string_in_logs_errors:
-		errors.append((last_time_joined.__name__, "Error searching for left pattern", search_string_in_logs_errors))
-		return (joined_time, "Error")
-	if not left_lines:
-		return (joined_time, "Still playing")
-
-	# Extract the left time
-	left_time = left_lines[0].split(']')[0][1:-4]
-
-	return (joined_time, left_time)
+	# Stream the files newest line first (zcat -f also passes plain files through) and grep them remotely
+	files = " ".join(shlex.quote(path) for path in log_files_paths)
+	patterns = " ".join(f"-e {shlex.quote(string)}" for string in strings)
+	# grep flushes each match so stop sees it right away instead of once a whole buffer has filled
+	# Once ssh is gone, grep dies on its next write, then tac dies writing to it and the loop stops before older files
+	# The C locale lets grep compare bytes instead of decoding multibyte characters
+	command = f"for f in {files}; do zcat -f -- \"$f\" | tac || break; done | LC_ALL=C grep -F --line-buffered {patterns}"
+	returncode, lines, stderr = await stream_ssh_command(command, lambda line: stop(line.decode("utf-8", "replace")))
+
+	# grep exits with 1 when there are no matches
+	if returncode not in (0, 1):
+		errors.append((search_strings_in_logs.__name__, "SSH Command Error when searching log files", f"Error when searching {strings}: {stderr.decode('utf-8', 'replace')}"))
+		return []
+	return [line.decode("utf-8", "replace") for line in lines]
+
+async def last_times_joined(usernames: Optional[list[str]]=None, errors: Optional[list]=None) -> dict[str, tuple[str, str]]:
+	"""
+	Get the last time each player joined and left the server, with a single search for all of them.
+	If no usernames are given, all the players on the server are looked up.
+	"""
+	if errors is None:
+		errors = []
+	if usernames is None:
+		# Fetch the players while the logs are being searched, for any player
+		get_players_errors = []
+		players_task = asyncio.ensure_future(get_players(get_players_errors))
+		strings = [" joined the game", " left the game"]
+	else:
+		players_task = None
+		strings = [f"{username} {event} the game" for username in usernames for event in ("joined", "left")]
+
+	# Lines come newest first: keep each player's newest "left" until their newest "joined" is found
+	joined_times = {}
+	left_times = {}
+	pending = None # players still missing a "joined", once the wanted players are known
+	bad_line = None
+
+	def record_line(line: str) -> bool:
+		"""
+		Record the event of a line and return whether the search can stop.
+		"""
+		nonlocal pending, bad_line
+		match = JOIN_LEAVE_PATTERN.search(line)
+		if match and match.group(1) not in joined_times:
+			username, event = match.groups()
+			log_time = extract_log_time(line)
+			if not log_time:
+				bad_line = line
+				return True
+			if event == "joined":
+				joined_times[username] = log_time
+				if pending is not None:
+					pending.discard(username)
+			elif username not in left_times:
+				left_times[username] = log_time
+		if pending is None:
+			if players_task is None:
+				pending = set(usernames) - joined_times.keys()
+			elif players_task.done():
+				pending = set(players_task.result().values()) - joined_times.keys()
+			else:
+				return False
+		return not pending
+
+	search_strings_in_logs_errors = []
+	players = None
+	try:
+		await search_strings_in_logs(strings, stop=record_line, errors=search_strings_in_logs_errors)
+		if players_task is not None:
+			players = await players_task
+	finally:
+		if players_task is not None:
+			# If the search raised, don't leave the players fetch running or its failure unretrieved
+			players_task.cancel()
+			await asyncio.gather(players_task, return_exceptions=True)
+	if players_task is not None:
+		if not players:
+			errors.append((last_times_joined.__name__, "Failed to get players data", get_players_errors))
+			return {}
+		usernames = list(players.values())
+	if search_strings_in_logs_errors:
+		errors.append((last_times_joined.__name__, "Error searching for joined and left patterns", search_strings_in_logs_errors))
+		return {}
+	if bad_line is not None:
+		errors.append((last_times_joined.__name__, "No timestamp found", f"Unexpected log line format: {bad_line}"))
+		return {}
+
+	return {
+		username: (joined_times[username], left_times.get(username, "Still playing"))
+		if username in joined_times else ("No data", "No data")
+		for username in usernames
+	}
 
 
 # ========= DISCORD EVENTS ==========
@@ -399,12 +515,26 @@ async def on_ready():
 	"""
 	Start processes when the bot is ready.
 	"""
+	global OWNER_TAG, privileged_users_lock
 	logging.info(f"We have logged in as {bot.user}")
-	scheduler.start()
-	scheduler.add_job(daily_update, CronTrigger(hour=0, minute=0))
 	if not os.path.exists(PRIVILEGED_USERS_PATH):
 		os.makedirs(os.path.dirname(PRIVILEGED_USERS_PATH), exist_ok=True)
 		await write_to_file(PRIVILEGED_USERS_PATH, "")
+	if privileged_users_lock is None:
+		privileged_users_lock = asyncio.Lock()
+	PRIVILEGED_USERS.update(load_privileged_users())
+	if not scheduler.running:
+		# on_ready fires again after reconnects, schedule the daily update only once
+		scheduler.start()
+		scheduler.add_job(daily_update, CronTrigger(hour=0, minute=0))
+	if OWNER_ID and OWNER_TAG is None:
+		# Owner commands stay unavailable if this fails, the rest of the bot keeps working
+		try:
+			OWNER_TAG = str(await bot.fetch_user(OWNER_ID))
+		except discord.HTTPException as e:
+			log_errors([(on_ready.__name__, "Failed to fetch the owner user", f"Error when fetching user {OWNER_ID}: {e}")])
+	# Open the master ssh connection now so the first command doesn't pay the handshake
+	await run_ssh_command("true")
 
 @bot.event
 async def on_message(message: discord.Message):
@@ -420,6 +550,10 @@ async def on_message(message: discord.Message):
 		await message.channel.send("Sorry you can't talk to me in private")
 		return
 
+	if not message.content.startswith(bot.command_prefix):
+		# skip the command dispatch for regular chat messages
+		return
+
 	# process commands normally
 	await bot.process_commands(message)
 
@@ -429,8 +563,13 @@ async def daily_update():
 	"""
 	logging.info("Running daily update...")
 	errors = []
+	# Store fresh data, which then also serves the commands
+	get_players.cache_clear()
+	get_player_stats.cache_clear()
 
 	await update_players_data(errors)
+	if errors:
+		log_errors([("daily_update", "Failed to update players data", errors)])
 
 	logging.info("Daily update complete")
 
@@ -452,6 +591,40 @@ async def mine(
 		await ctx.send("Invalid command. Use `%mine help` to see available commands.")
 		return
 
+def get_sorted_mine_commands() -> list:
+	"""
+	Get the subcommands of mine sorted by name, sorting them only once since they are registered at import.
+	"""
+	global sorted_mine_commands
+	if sorted_mine_commands is None:
+		sorted_mine_commands = sorted(mine.commands, key=lambda command: command.name)
+	return sorted_mine_commands
+
+def get_help_commands(is_privileged: bool, is_owner: bool) -> list:
+	"""
+	Get the sorted subcommands of mine listed by help for a permission level, filtering them only once per level.
+	"""
+	key = (is_privileged, is_owner)
+	if key not in help_commands:
+		help_commands[key] = [
+			command for command in get_sorted_mine_commands()
+			if command.name != "help"
+			and not (getattr(command.callback, "is_privileged", False) and not is_privileged)
+			and not (getattr(command.callback, "is_owner", False) and not is_owner)
+		]
+	return help_commands[key]
+
+def get_help_thumbnail() -> discord.File:
+	"""
+	Get the help thumbnail as a new file to attach, reading the image from disk only once.
+	"""
+	global help_thumbnail
+	if help_thumbnail is None:
+		with open(os.path.join(STATIC_PATH, HELP_THUMBNAIL_FILENAME), "rb") as f:
+			help_thumbnail = f.read()
+	# A discord File is consumed when sent, so wrap the cached bytes in a new one each time
+	return discord.File(io.BytesIO(help_thumbnail), filename=HELP_THUMBNAIL_FILENAME)
+
 # Create a new help command
 bot.remove_command("help") # Remove the default
 @mine.command(
@@ -479,21 +652,15 @@ async def help(
 			await ctx.send(f"There is no command with name `{arg0}`.")
 	else:
 		# List all commands
-		filename = "minecraft.png"
-		file = discord.File(os.path.join(STATIC_PATH, filename), filename=filename)
+		file = get_help_thumbnail()
 		embed = Embed(title="Minecraft Bot", description=bot.description, color=color)
-		embed.set_thumbnail(url=f"attachment://{filename}")
+		embed.set_thumbnail(url=f"attachment://{HELP_THUMBNAIL_FILENAME}")
 		embed.set_author(name="Eric Lopez", url="https://github.com/Pikurrot", icon_url="https://avatars.githubusercontent.com/u/90217719?v=4")
 		
-		is_privileged = await is_privileged_user(str(ctx.author))
-		is_owner = await is_owner_user(str(ctx.author))
-		for command in sorted(mine.commands, key=lambda command: command.name):
-			if command.name != "help":
-				command_is_privileged = getattr(command.callback, "is_privileged", False)
-				command_is_owner = getattr(command.callback, "is_owner", False)
-				can_execute = not ((command_is_privileged and not is_privileged) or (command_is_owner and not is_owner))
-				if can_execute:
-					embed.add_field(name=command.name, value=command.brief, inline=False)
+		is_privileged = is_privileged_user(str(ctx.author))
+		is_owner = is_owner_user(str(ctx.author))
+		for command in get_help_commands(is_privileged, is_owner):
+			embed.add_field(name=command.name, value=command.brief, inline=False)
 		await ctx.send(embed=embed, file=file)
 
 
@@ -524,10 +691,9 @@ async def grant_privileges(
 	"""
 	Grant privileges to a user.
 	"""
-	privileged_users = await load_privileged_users()
-	if username not in privileged_users:
-		privileged_users.append(username)
-		await save_privileged_users(privileged_users)
+	if username not in PRIVILEGED_USERS:
+		PRIVILEGED_USERS.add(username)
+		await save_privileged_users()
 		await ctx.send(f"Granted privileges to {username}.")
 	else:
 		await ctx.send(f"{username} already has privileges.")
@@ -546,10 +712,9 @@ async def revoke_privileges(
 	"""
 	Revoke privileges from a user.
 	"""
-	privileged_users = await load_privileged_users()
-	if username in privileged_users:
-		privileged_users.remove(username)
-		await save_privileged_users(privileged_users)
+	if username in PRIVILEGED_USERS:
+		PRIVILEGED_USERS.remove(username)
+		await save_privileged_users()
 		await ctx.send(f"Revoked privileges from {username}.")
 	else:
 		await ctx.send(f"{username} does not have privileges.")
@@ -576,8 +741,8 @@ async def list_players(
 			log_errors([("get_players", msg, errors)])
 			await ctx.send(msg)
 			return
-		usernames = [f"`{players[uuid]}`" for uuid in players]
-		await ctx.send(f"Players on the server: {', '.join(usernames)}")
+		usernames = ", ".join(f"`{username}`" for username in players.values())
+		await ctx.send(f"Players on the server: {usernames}")
 
 
 @mine.command(
@@ -598,7 +763,7 @@ async def playtime(
 	
 		if tgt_username is None:
 			# Get all players
-			players_lst = [uuid for uuid, username_ in players.items()]
+			players_lst = list(players)
 		else:
 			# Get the player/s with the given username
 			players_lst = [uuid for uuid, username_ in players.items() if username_ == tgt_username] # can be multiple
@@ -617,11 +782,14 @@ async def playtime(
 			log_errors([(playtime.__name__, msg, get_player_stats_errors)])
 			await ctx.send(msg)
 			return
+		if get_player_stats_errors:
+			# Some players could not be read, show the rest but keep track of the failures
+			log_errors([(playtime.__name__, "Failed to get some player stats", get_player_stats_errors)])
 		
 		# Extract the playtime of the player/s
 		playtime_dict = {}
 		for uuid, stats in all_players_stats.items():
-			playtime_int = stats.get("minecraft:custom", {}).get("minecraft:play_time", 0) // 20 # ticks -> seconds
+			playtime_int = get_playtime_seconds(stats)
 			playtime_dict[players[uuid]] = playtime_int
 		
 		if not playtime_dict:
@@ -632,7 +800,7 @@ async def playtime(
 		
 		# Format the playtime string
 		playtime_dict = dict(sorted(playtime_dict.items(), key=lambda item: item[1], reverse=True))
-		playtime_str = "\n".join([f"`{username}`: {playtime // 3600}h {(playtime % 3600) // 60}min" for username, playtime in playtime_dict.items()])
+		playtime_str = "\n".join(f"`{username}`: {playtime // 3600}h {(playtime % 3600) // 60}min" for username, playtime in playtime_dict.items())
 		await ctx.send(f"Playtime:\n{playtime_str}")
 
 
@@ -686,40 +854,42 @@ async def last_joined(
 	"""
 	Show the last time players joined and left the server.
 	"""
-	global cache
 	logging.info(f"last_joined command executed by {ctx.author}")
 	async with ctx.typing():
-		message = ""
-
-		if username is None:
-			players = await get_players()
-			usernames_lst = list(players.values())
-		else:
-			usernames_lst = [username]
+		message_parts = []
+		usernames_lst = None if username is None else [username]
 
 		errors = []
-		cache = {}
-		last_joined_lst = await asyncio.gather(*(last_time_joined(username, errors) for username in usernames_lst))
-		cache = {}
+		last_joined_dict = await last_times_joined(usernames_lst, errors)
 		if errors:
 			msg = "Failed to get last joined time."
 			log_errors([("last_joined", msg, errors)])
 			await ctx.send(msg)
 			return
 
-		for username, (last_joined_time, last_left_time) in zip(usernames_lst, last_joined_lst):
+		now = datetime.now()
+		for username, (last_joined_time, last_left_time) in last_joined_dict.items():
+			if last_joined_time == "No data":
+				message_parts.append(f"`{username}`: No data\n")
+				continue
 			joined_time = parse_log_time(last_joined_time)
 			if last_left_time != "Still playing":
 				left_time = parse_log_time(last_left_time)
-				time_since_joined = time_since(joined_time)
+				time_since_joined = time_since(joined_time, now)
 				time_transcurred = format_timedelta(left_time - joined_time)
-				message += f"`{username}`: {joined_time} - {left_time} [{time_transcurred}] ({time_since_joined} ago)\n"
+				message_parts.append(f"`{username}`: {joined_time} - {left_time} [{time_transcurred}] ({time_since_joined} ago)\n")
 			else:
-				time_since_joined = time_since(joined_time)
-				message += f"`{username}`: {joined_time} - Still playing ({time_since_joined} ago)\n"
+				time_since_joined = time_since(joined_time, now)
+				message_parts.append(f"`{username}`: {joined_time} - Still playing ({time_since_joined} ago)\n")
 
-		await ctx.send(message) 
+		await ctx.send("".join(message_parts))
 
 
 if __name__ == "__main__":
+	try:
+		import uvloop
+		uvloop.install()
+	except ImportError:
+		# uvloop is not available on Windows, keep the default event loop
+		pass
 	bot.run(os.environ.get("DISCORD_TOKEN"))
@@ -1,88 +1,180 @@
 import asyncio
+from collections import OrderedDict
+from concurrent.futures import ThreadPoolExecutor
 from datetime import datetime, timedelta
-import json
-from dotenv import load_dotenv
+from functools import wraps
+import inspect
+from typing import Optional
+import orjson
+import re
+import time
 
-load_dotenv()
-DATA_PATH = "data"
-STATIC_PATH = "static"
+# Own pool for file I/O so reads and writes don't queue behind other blocking work in the default executor
+FILE_IO_EXECUTOR = ThreadPoolExecutor(max_workers=4, thread_name_prefix="file-io")
+LOG_TIME_PATTERN = re.compile(r"^\[([^\]]+)\.\d+\]") # like [15Jan2024 12:34:56.789]
+LOG_DATETIME_PATTERN = re.compile(r"(\d{1,2})([A-Za-z]{3})(\d{4}) (\d{1,2}):(\d{1,2}):(\d{1,2})") # like 15Jan2024 12:34:56
+MONTHS = {month: i for i, month in enumerate(("jan", "feb", "mar", "apr", "may", "jun", "jul", "aug", "sep", "oct", "nov", "dec"), 1)}
+TIME_PERIODS = (
+	("year", 60*60*24*365),
+	("month", 60*60*24*30),
+	("week", 60*60*24*7),
+	("day", 60*60*24),
+	("hour", 60*60),
+	("minute", 60),
+	("second", 1)
+)
 
-def read_from_file_sync(filename: str) -> str:
+class TTLCache:
+	"""
+	Cache with a maximum size and a time to live for its entries.
+	The least recently used entry is evicted when the cache is full.
+	"""
+	def __init__(self, maxsize: int, ttl: float):
+		self.maxsize = maxsize
+		self.ttl = ttl
+		self._data = OrderedDict()
+
+	def get(self, key, default=None):
+		item = self._data.get(key)
+		if item is None:
+			return default
+		value, expires_at = item
+		if expires_at <= time.monotonic():
+			del self._data[key]
+			return default
+		self._data.move_to_end(key)
+		return value
+
+	def set(self, key, value):
+		self._data[key] = (value, time.monotonic() + self.ttl)
+		self._data.move_to_end(key)
+		while len(self._data) > self.maxsize:
+			self._data.popitem(last=False)
+
+	def clear(self):
+		self._data.clear()
+
+def async_ttl_cache(ttl: float, key, maxsize: int=128):
+	"""
+	Cache the results of a coroutine function for ttl seconds, keyed by key(*args, **kwargs).
+	The function must take an errors list. Only non-empty results reported without errors are cached,
+	concurrent calls with the same key share a single call and each caller receives a copy of its errors.
+	The cache can be emptied with the cache_clear attribute of the decorated function.
+	"""
+	def decorator(func):
+		cache = TTLCache(maxsize, ttl)
+		inflight = {}
+		signature = inspect.signature(func)
+
+		@wraps(func)
+		async def wrapper(*args, **kwargs):
+			cache_key = key(*args, **kwargs)
+			result = cache.get(cache_key)
+			if result is not None:
+				return result
+			bound = signature.bind(*args, **kwargs)
+			caller_errors = bound.arguments.get("errors")
+			if cache_key in inflight:
+				task, call_errors = inflight[cache_key]
+				result = await asyncio.shield(task)
+			else:
+				# Collect the errors apart, to hand them to every caller sharing the call
+				call_errors = []
+				bound.arguments["errors"] = call_errors
+				task = asyncio.ensure_future(func(*bound.args, **bound.kwargs))
+				inflight[cache_key] = (task, call_errors)
+				try:
+					result = await asyncio.shield(task)
+				finally:
+					inflight.pop(cache_key, None)
+				# A result with errors may be partial, so it is not reused
+				if result and not call_errors:
+					cache.set(cache_key, result)
+			if caller_errors is not None:
+				caller_errors.extend(call_errors)
+			return result
+
+		wrapper.cache_clear = cache.clear
+		return wrapper
+	return decorator
+
+async def run_file_io(func, *args):
+	"""
+	Run a blocking file operation in the file I/O thread pool.
+	"""
+	return await asyncio.get_running_loop().run_in_executor(FILE_IO_EXECUTOR, func, *args)
+
+def read_from_file_sync(filename: str) -> bytes:
 	try:
-		with open(filename, "r") as f:
+		with open(filename, "rb") as f:
 			return f.read()
 	except FileNotFoundError:
 		print(f"Error: The file {filename} does not exist.")
-		return ""
+		return b""
 
-async def read_from_file(filename: str) -> str:
-	loop = asyncio.get_event_loop()
-	content = await loop.run_in_executor(None, read_from_file_sync, filename)
-	return content
+async def read_from_file(filename: str) -> bytes:
+	return await run_file_io(read_from_file_sync, filename)
 
 def write_to_file_sync(filename: str, content: str):
 	with open(filename, "w") as f:
 		f.write(content)
 
 async def write_to_file(filename: str, content: str):
-	loop = asyncio.get_event_loop()
-	await loop.run_in_executor(None, write_to_file_sync, filename, content)
+	await run_file_io(write_to_file_sync, filename, content)
+
+def write_bytes_to_file_sync(filename: str, data: bytes):
+	with open(filename, "wb") as f:
+		f.write(data)
 
 def read_json_sync(filename: str) -> dict:
 	try:
 		content = read_from_file_sync(filename)
-		return json.loads(content)
-	except json.JSONDecodeError:
+		return orjson.loads(content)
+	except orjson.JSONDecodeError:
 		return {}
 
 async def read_json(filename: str) -> dict:
-	return json.loads(await read_from_file(filename))
+	try:
+		return orjson.loads(await read_from_file(filename))
+	except orjson.JSONDecodeError:
+		return {}
 
 def write_json_sync(filename: str, content: dict):
-	write_to_file_sync(filename, json.dumps(content))
+	# orjson produces bytes, so write them as-is instead of encoding a str again
+	write_bytes_to_file_sync(filename, orjson.dumps(content))
 
 async def write_json(filename: str, content: dict):
-	await write_to_file(filename, json.dumps(content))
+	# Serialize in the pool too, so large payloads don't block the event loop
+	await run_file_io(write_json_sync, filename, content)
+
+def extract_log_time(line: str) -> str:
+	"""
+	Extract the timestamp of a log line without its milliseconds, or "" if there is none.
+	"""
+	match = LOG_TIME_PATTERN.match(line)
+	return match.group(1) if match else ""
 
-def extract_json_objects(text: str) -> list[str]:
+def parse_log_time(time_str: str) -> datetime:
 	"""
-	Extract JSON objects from a string.
+	Parse a log timestamp like "15Jan2024 12:34:56", without going through strptime.
 	"""
-	json_objects = []
-	open_brackets = 0
-	start_index = 0
-	for i, char in enumerate(text):
-		if char == '{':
-			if open_brackets == 0:
-				start_index = i
-			open_brackets += 1
-		elif char == '}':
-			open_brackets -= 1
-			if open_brackets == 0:
-				json_objects.append(text[start_index:i+1])
-	return json_objects
-
-def parse_log_time(time_str):
-	return datetime.strptime(time_str, "%d%b%Y %H:%M:%S")
+	match = LOG_DATETIME_PATTERN.fullmatch(time_str)
+	month = MONTHS.get(match.group(2).lower()) if match else None
+	if month is None:
+		raise ValueError(f"time data {time_str!r} does not match format '%d%b%Y %H:%M:%S'")
+	day, _, year, hour, minute, second = match.groups()
+	return datetime(int(year), month, int(day), int(hour), int(minute), int(second))
 
 def format_timedelta(timedelta_obj: timedelta) -> str:
-	seconds = timedelta_obj.total_seconds()
-	periods = [
-		("year", 60*60*24*365),
-		("month", 60*60*24*30),
-		("week", 60*60*24*7),
-		("day", 60*60*24),
-		("hour", 60*60),
-		("minute", 60),
-		("second", 1)
-	]
-	for period_name, period_seconds in periods:
+	seconds = int(timedelta_obj.total_seconds())
+	for period_name, period_seconds in TIME_PERIODS:
 		if seconds >= period_seconds:
-			period_value, _ = divmod(seconds, period_seconds)
-			return f"{int(period_value)} {period_name}{'s' if period_value > 1 else ''}"
+			period_value = seconds // period_seconds
+			return f"{period_value} {period_name}{'s' if period_value > 1 else ''}"
 	return "0 seconds"
 
-def time_since(dt):
-	now = datetime.now()
+def time_since(dt: datetime, now: Optional[datetime]=None) -> str:
+	if now is None:
+		now = datetime.now()
 	diff: timedelta = now - dt
 	return format_timedelta(diff)